@@ -1,115 +1,345 @@
-import streamlit as st
+import asyncio
+import logging
 import re
-import requests
+import threading
 import time
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from urllib.parse import urlparse
-from serpapi import GoogleSearch
-from huggingface_hub import InferenceClient
-import traceback
-import plotly.graph_objects as go
+
+import httpx
+import orjson
+import streamlit as st
+from lxml import etree, html as lxml_html
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
 
 st.set_page_config(page_title="Fake News Verifier", layout="centered")
 st.title("📰 Advanced Fake News Detector")
 
 # ---------------- HUGGINGFACE API SUMMARIZER ----------------
-def generate_summary(text):
-    try:
-        client = InferenceClient(
-            api_key=st.secrets["HUGGINGFACE_API_KEY"]
-        )
+SUMMARY_MODEL = "microsoft/Phi-3-mini-4k-instruct"
+SUMMARY_INPUT_WORDS = 320
+SUMMARY_MAX_TOKENS = 150
+SUMMARY_MIN_WORDS = 120
+SUMMARY_TIMEOUT = 30
+SUMMARY_PROMPT = "Summarize the following news excerpts in 3-5 concise sentences:\n\n{excerpts}"
+
+@st.cache_resource
+def load_summarizer():
+    # Imported here so a cold start doesn't pay for huggingface_hub until
+    # a query actually needs a summary.
+    from huggingface_hub import InferenceClient
+
+    return InferenceClient(
+        model=st.secrets.get("HF_SUMMARY_MODEL", SUMMARY_MODEL),
+        api_key=st.secrets["HUGGINGFACE_API_KEY"],
+        timeout=SUMMARY_TIMEOUT
+    )
+
+def clip_words(text, limit):
+    # split() also folds the runs of spaces clean_text leaves behind,
+    # which would otherwise be sent to the model as tokens of their own.
+    return " ".join(text.split()[:limit])
+
+def _request_summary(client, snippets):
+    # One request for all sources, each excerpt numbered so the model
+    # sees where one article ends and the next begins.
+    per_snippet = SUMMARY_INPUT_WORDS // len(snippets)
+    excerpts = "\n\n".join(
+        f"[{idx}] {clip_words(snippet, per_snippet)}"
+        for idx, snippet in enumerate(snippets, 1)
+    )
+
+    messages = [
+        {
+            "role": "user",
+            "content": SUMMARY_PROMPT.format(excerpts=excerpts)
+        }
+    ]
 
-        messages = [
-            {
-                "role": "user",
-                "content": f"Summarize the following news article in 3-5 concise sentences:\n\n{text[:2000]}"
-            }
-        ]
+    response = client.chat_completion(
+        messages=messages,
+        max_tokens=SUMMARY_MAX_TOKENS
+    )
 
-        response = client.chat_completion(
-            model="microsoft/Phi-3-mini-4k-instruct",
-            messages=messages,
-            max_tokens=150
-        )
+    return response.choices[0].message.content
+
+def summarize_batch(snippet_sets):
+    # One summary per headline's snippets. Requests are issued together
+    # so the hosted endpoint can batch them, rather than one at a time.
+    client = load_summarizer()
+    if len(snippet_sets) <= 1:
+        return [_request_summary(client, snippets) for snippets in snippet_sets]
 
-        return response.choices[0].message.content
+    with ThreadPoolExecutor(max_workers=min(len(snippet_sets), 8)) as pool:
+        return list(pool.map(partial(_request_summary, client), snippet_sets))
+
+@st.cache_data(ttl=86400, show_spinner=False, max_entries=512)
+def _summarize(snippets):
+    return summarize_batch([snippets])[0]
+
+def generate_summary(snippets):
+    # API failures propagate out of _summarize so the fallback below is
+    # never cached in its place.
+    try:
+        return _summarize(snippets)
 
     except Exception as e:
+        text = " ".join(snippets)
         sentences = text.split(". ")
         if len(sentences) > 5:
             return ". ".join(sentences[:5]) + "."
         return text[:500]
 # ---------------- TRUSTED SOURCES ----------------
-TRUSTED_SOURCES = [
+TRUSTED_SOURCES = frozenset({
     "bbc.com", "reuters.com", "ndtv.com", "cnn.com", "indiatoday.in",
     "thehindu.com", "timesofindia.indiatimes.com", "hindustantimes.com",
     "aljazeera.com", "apnews.com", "foxnews.com", "washingtonpost.com",
     "nytimes.com", "economictimes.indiatimes.com", "scroll.in", "bbc.co.uk",
     "cbc.ca", "theguardian.com", "cnbc.com", "dw.com", "npr.org",
     "bbcnews.com", "news18.com", "thewire.in", "indianexpress.com"
-]
+})
 
 # ---------------- TEXT CLEANING ----------------
+_CLEAN_RE = re.compile(r'http\S+|\W+')
+_URL_RE = re.compile(r'http\S+')
+# ASCII characters \W matches, blanked in one C-level translate pass.
+_ASCII_NON_WORD = str.maketrans({
+    chr(code): ' ' for code in range(128)
+    if not (chr(code).isalnum() or chr(code) == '_')
+})
+
 def clean_text(text):
-    text = re.sub(r'http\S+', '', text)
-    text = re.sub(r'\W', ' ', text)
-    return text.lower()
+    # Most snippets are plain ASCII; only text with other characters needs
+    # the regex for Unicode-aware \W matching.
+    if text.isascii():
+        return _URL_RE.sub(' ', text).translate(_ASCII_NON_WORD).lower()
+    return _CLEAN_RE.sub(' ', text).lower()
+
+# ---------------- DUPLICATE SNIPPETS ----------------
+DUPLICATE_SIMILARITY = 0.6
+
+def shingles(text, size=5):
+    # Word n-grams; texts shorter than `size` words form a single shingle.
+    words = text.split()
+    return {tuple(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+def dedupe_snippets(pairs):
+    # Outlets often reprint the same wire copy; of any (cleaned, raw)
+    # pairs whose cleaned text largely overlaps, keep only the first.
+    kept, kept_shingles = [], []
+    for cleaned, raw in pairs:
+        current = shingles(cleaned)
+        if all(len(current & other) / len(current | other) < DUPLICATE_SIMILARITY
+               for other in kept_shingles):
+            kept.append((cleaned, raw))
+            kept_shingles.append(current)
+    return kept
 
 # ---------------- TRUST CHECK ----------------
+@lru_cache(maxsize=1024)
+def _domain(url):
+    # Shared by the trust check and per-host rate limiting, which both see
+    # the same handful of URLs for every query.
+    return (urlparse(url).hostname or "").removeprefix("www.")
+
 def is_trusted_source(url):
-    domain = urlparse(url).netloc.replace("www.", "").lower()
-    return any(trusted_domain in domain for trusted_domain in TRUSTED_SOURCES)
+    host = _domain(url)
+    while "." in host:
+        if host in TRUSTED_SOURCES:
+            return True
+        host = host.split(".", 1)[1]
+    return False
+
+# ---------------- HTTP CLIENT ----------------
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+@st.cache_resource
+def get_http_client():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    # A custom transport owns the pool, so the limits are set on it.
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=1,
+        limits=httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=20,
+            keepalive_expiry=60
+        )
+    )
+    client = httpx.AsyncClient(
+        transport=transport,
+        headers={"User-Agent": USER_AGENT},
+        timeout=10,
+        follow_redirects=True
+    )
+    return loop, client
 
 # ---------------- SEARCH NEWS ----------------
-def search_news(query, max_results=5):
-    matches = []
-    try:
-        params = {
-            "engine": "google",
-            "q": query,
-            "api_key": st.secrets["SERPAPI_KEY"],
-            "num": max_results
-        }
-        search = GoogleSearch(params)
-        results = search.get_dict()
-
-        for result in results.get('organic_results', [])[:max_results]:
-            url = result.get('link')
-            if not url or not url.startswith("http"):
-                continue
-
+MAX_PAGE_BYTES = 256 * 1024
+SNIPPET_CHARS = 2048
+MAX_PARAGRAPHS = 5
+
+def extract_snippet(html, charset=None, limit=SNIPPET_CHARS):
+    # A charset from the Content-Type header is trusted as-is; only pages
+    # without one fall back to <meta> sniffing inside the parser.
+    if LexborHTMLParser is not None:
+        if charset:
             try:
-                response = requests.get(url, timeout=10)
-                if response.status_code != 200:
-                    continue
-
-                soup = BeautifulSoup(response.text, 'html.parser')
-                paragraphs = soup.find_all('p')
-                text_snippet = ' '.join([p.get_text() for p in paragraphs[:5]])
-
-                if text_snippet.strip():
-                    matches.append((url, text_snippet))
-
-                time.sleep(1)
+                html = html.decode(charset, "ignore")
+            except LookupError:
+                pass
+        # Lexbor reads raw bytes as UTF-8 unless asked to detect the encoding.
+        document = LexborHTMLParser(html, encoding=isinstance(html, bytes))
+        paragraphs = (p.text(separator=' ', strip=True) for p in document.css('p'))
+    else:
+        try:
+            parser = lxml_html.HTMLParser(encoding=charset) if charset else None
+        except LookupError:
+            parser = None
+        root = lxml_html.document_fromstring(html, parser=parser)
+        paragraphs = (p.text_content() for p in root.iter('p'))
+
+    parts, size = [], 0
+    for text in paragraphs:
+        parts.append(text)
+        size += len(text)
+        if size >= limit or len(parts) >= MAX_PARAGRAPHS:
+            break
+    return ' '.join(parts)
+
+HOST_INTERVAL = 1.0
+
+@st.cache_resource
+def get_host_clock():
+    # Earliest time each host may be contacted again. Only read and
+    # written on the HTTP client's event loop thread.
+    return {}
+
+async def polite_wait(host_clock, url):
+    host = _domain(url)
+    now = time.monotonic()
+    if len(host_clock) > 1024:
+        for stale in [h for h, t in host_clock.items() if t <= now]:
+            del host_clock[stale]
+
+    slot = max(now, host_clock.get(host, 0.0))
+    host_clock[host] = slot + HOST_INTERVAL
+    if slot > now:
+        await asyncio.sleep(slot - now)
+
+async def fetch_article(client, semaphore, host_clock, url):
+    await polite_wait(host_clock, url)
+    async with semaphore:
+        async with client.stream("GET", url) as response:
+            if response.status_code != 200:
+                return None
+
+            # Only the first few paragraphs are used, so stop reading once
+            # enough of them have been closed. An incremental parser keeps
+            # '</p>' inside scripts or inline JSON from being counted.
+            paragraph_ends = etree.HTMLPullParser(events=("end",), tag="p")
+            chunks, size, closed = [], 0, 0
+            async for chunk in response.aiter_bytes(65536):
+                chunks.append(chunk)
+                size += len(chunk)
+                paragraph_ends.feed(chunk)
+                closed += sum(1 for _ in paragraph_ends.read_events())
+                if size >= MAX_PAGE_BYTES or closed >= MAX_PARAGRAPHS or b"</body>" in chunk.lower():
+                    break
+            html = b"".join(chunks)
+            charset = response.charset_encoding
+
+    # Parse off the event loop so other pages keep downloading meanwhile.
+    text_snippet = await asyncio.to_thread(extract_snippet, html, charset)
+
+    if text_snippet.strip():
+        return (url, text_snippet)
+    return None
+
+async def fetch_articles(client, host_clock, urls):
+    # Every page is awaited: the confidence shown is the trusted share of
+    # all fetched results, and the pages already download concurrently.
+    semaphore = asyncio.Semaphore(5)
+    fetched = await asyncio.gather(
+        *(fetch_article(client, semaphore, host_clock, url) for url in urls),
+        return_exceptions=True
+    )
+    return [match for match in fetched if isinstance(match, tuple)]
+
+SERPAPI_URL = "https://serpapi.com/search.json"
+
+class SearchError(Exception):
+    pass
+
+async def serp_search_async(client, params):
+    response = await client.get(SERPAPI_URL, params=params, timeout=15)
+    try:
+        response.raise_for_status()
+    except httpx.HTTPStatusError:
+        # httpx's own message embeds the request URL, api_key included, so
+        # surface only the status and SerpAPI's error text.
+        try:
+            detail = orjson.loads(response.content).get("error", "")
+        except (orjson.JSONDecodeError, AttributeError):
+            detail = ""
+        message = f"News search failed with status {response.status_code}"
+        raise SearchError(f"{message}: {detail}" if detail else message) from None
+    return orjson.loads(response.content)
+
+@st.cache_data(ttl=600, show_spinner=False, max_entries=512)
+def _serp_search(query, num):
+    params = {
+        "engine": "google",
+        "q": query,
+        "api_key": st.secrets["SERPAPI_KEY"],
+        "num": num
+    }
+    loop, client = get_http_client()
+    return asyncio.run_coroutine_threadsafe(
+        serp_search_async(client, params), loop
+    ).result()
 
-            except Exception:
-                continue
+@st.cache_data(ttl=900, show_spinner=False, max_entries=512)
+def search_news(query, max_results=5):
+    results = _serp_search(query, max_results)
 
-    except Exception as e:
-        st.error(f"❌ Search error: {e}")
+    urls = [
+        result.get('link') for result in results.get('organic_results', [])[:max_results]
+        if (result.get('link') or '').startswith("http")
+    ]
 
-    return matches
+    loop, client = get_http_client()
+    return asyncio.run_coroutine_threadsafe(
+        fetch_articles(client, get_host_clock(), urls), loop
+    ).result()
 
 # ---------------- EVALUATE NEWS ----------------
+def normalize_query(query):
+    return " ".join(clean_text(query).split())
+
 def evaluate_news(query):
-    matches = search_news(query)
-    trusted_hits = []
+    # Headlines differing only in case, punctuation or spacing share
+    # one cache entry; the original text is still what gets searched.
+    return _evaluate_news(normalize_query(query), query)
+
+# Search failures raise instead of returning an empty result, so that
+# st.cache_data never keeps a transient error around for the whole TTL.
+# The leading underscore keeps _query out of the cache key.
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=512)
+def _evaluate_news(key, _query):
+    matches = search_news(_query)
+    trusted_hits = [match for match in matches if is_trusted_source(match[0])]
     total_hits = len(matches)
 
-    for url, snippet in matches:
-        if is_trusted_source(url):
-            trusted_hits.append((url, snippet))
-
     if total_hits == 0:
         return {
             "status": "Unable to verify",
@@ -121,13 +351,24 @@ def evaluate_news(query):
     confidence = round((len(trusted_hits) / total_hits) * 100, 2)
     status = "REAL" if confidence >= 50 else "FAKE"
 
-    all_text = ' '.join(snippet for _, snippet in trusted_hits or matches)
-    clean_input = clean_text(all_text)
-
-    if len(clean_input.split()) > 20:
-        summary = generate_summary(clean_input)
+    if not trusted_hits:
+        summary = "No trusted sources matched; summary skipped."
     else:
-        summary = "Not enough data to generate a reliable summary."
+        unique = dedupe_snippets([
+            (clean_text(snippet), snippet) for _, snippet in trusted_hits
+        ])
+        snippets = [cleaned for cleaned, _ in unique]
+        word_count = sum(len(snippet.split()) for snippet in snippets)
+
+        if word_count <= 20:
+            summary = "Not enough data to generate a reliable summary."
+        elif word_count < SUMMARY_MIN_WORDS or (status == "REAL" and len(unique) == 1):
+            # Already about summary-sized, or every trusted outlet carries
+            # the same copy; show the trusted text itself.
+            raw_text = " ".join(" ".join(raw for _, raw in unique).split())
+            summary = raw_text if len(raw_text) <= 200 else raw_text[:200] + "…"
+        else:
+            summary = generate_summary(snippets)
 
     return {
         "status": status,
@@ -136,35 +377,60 @@ def evaluate_news(query):
         "summary": summary
     }
 
-# ---------- Animated Donut ----------
-def animated_confidence_donut(confidence, status):
-    color = "#2ecc71" if status == "REAL" else "#e74c3c"
-    placeholder = st.empty()
-
-    for val in range(0, int(confidence) + 1, 2):
-        fig = go.Figure(data=[
-            go.Pie(
-                values=[val, 100 - val],
-                hole=0.7,
-                marker_colors=[color, "rgba(200,200,200,0.15)"],
-                textinfo="none",
-                sort=False,
-                direction="clockwise"
-            )
-        ])
+# ---------- Confidence Donut ----------
+@st.cache_data(max_entries=64, show_spinner=False)
+def confidence_donut(confidence, status, animate=False):
+    # Deferred so the first page paint does not wait on Plotly's import.
+    import plotly.graph_objects as go
 
-        fig.update_layout(
-            showlegend=False,
-            height=350,
-            margin=dict(t=40, b=20, l=10, r=10),
-            annotations=[dict(
-                text=f"<b>{val}%</b><br>Confidence",
-                x=0.5, y=0.5, font_size=22, showarrow=False
+    color = "#2ecc71" if status == "REAL" else "#e74c3c"
+    final = int(confidence)
+
+    def label(val):
+        return [dict(
+            text=f"<b>{val}%</b><br>Confidence",
+            x=0.5, y=0.5, font_size=22, showarrow=False
+        )]
+
+    fig = go.Figure(data=[go.Pie(
+        values=[final, 100 - final],
+        hole=0.7,
+        marker_colors=[color, "rgba(200,200,200,0.15)"],
+        textinfo="none",
+        sort=False,
+        direction="clockwise"
+    )])
+    fig.update_layout(
+        showlegend=False,
+        height=350,
+        margin=dict(t=40, b=20, l=10, r=10),
+        annotations=label(final)
+    )
+
+    if animate:
+        # Styling lives on the base trace only; each frame carries just the
+        # values and label that change, which Plotly merges onto that trace.
+        fig.frames = [
+            dict(data=[dict(type="pie", values=[val, 100 - val])],
+                 layout=dict(annotations=label(val)))
+            for val in list(range(0, final, 2)) + [final]
+        ]
+        fig.update_layout(updatemenus=[dict(
+            type="buttons",
+            showactive=False,
+            x=0.5, y=-0.05, xanchor="center",
+            buttons=[dict(
+                label="▶ Replay",
+                method="animate",
+                args=[None, dict(
+                    frame=dict(duration=30, redraw=True),
+                    transition=dict(duration=0),
+                    fromcurrent=False
+                )]
             )]
-        )
+        )])
 
-        placeholder.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
-        time.sleep(0.03)
+    return fig
 
 # ---------------- MAIN APP ----------------
 query = st.text_input("Enter a news headline to verify:")
@@ -190,7 +456,16 @@ if query:
             st.info("No matches found on trusted news sites.")
 
         st.subheader("Confidence Visualization")
-        animated_confidence_donut(result['confidence'], result['status'])
-
-    except Exception as e:
-        st.error(f"🚨 Unexpected error: {e}")
+        st.checkbox("Animate chart", key="animate")
+        fig = confidence_donut(
+            result['confidence'], result['status'],
+            animate=st.session_state.get("animate", False)
+        )
+        st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
+
+    except SearchError as e:
+        st.error(f"🚨 {e}")
+    except Exception:
+        # Details go to the server log only; the page must not echo them.
+        logging.exception("evaluate_news failed")
+        st.error("🚨 Unexpected error while verifying this headline. Please try again.")